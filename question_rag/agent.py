@@ -2,14 +2,20 @@
 
 from __future__ import annotations
 
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Any
 
 from google.adk.agents import Agent
 from google.adk.tools import FunctionTool
 
+from question_rag.config import settings
 from question_rag.agents.retrieval_tools import (
+    _get_corpus_name,
     search_questions,
+    search_questions_batch,
     search_questions_by_concept,
     get_question_by_id,
     QuestionHit,
@@ -18,7 +24,19 @@ from question_rag.agents.retrieval_tools import (
 # ---------- System prompt ----------
 
 SYSTEM_PROMPT_PATH = Path(__file__).parent / "agents" / "retrieval_agent_system_prompt.txt"
-SYSTEM_PROMPT = SYSTEM_PROMPT_PATH.read_text(encoding="utf-8").strip()
+# SYSTEM_PROMPT is read on first access (see __getattr__ at the bottom)
+
+
+def _load_system_prompt() -> str:
+    prompt = SYSTEM_PROMPT_PATH.read_text(encoding="utf-8").strip()
+    globals()["SYSTEM_PROMPT"] = prompt
+    return prompt
+
+
+# Used instead of SYSTEM_PROMPT when USE_SERVER_SIDE_RAG is on (no tool list)
+SERVER_SIDE_RAG_PROMPT_PATH = (
+    Path(__file__).parent / "agents" / "retrieval_agent_server_rag_prompt.txt"
+)
 
 
 # ---------- Tool functions (plain Python) ----------
@@ -35,16 +53,25 @@ def retrieve_exam_questions(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         A list of dicts with: id, text, main_concept, concepts, score.
     """
     hits: List[QuestionHit] = search_questions(query=query, top_k=top_k)
-    return [
-        {
-            "id": h.id,
-            "text": h.text,
-            "main_concept": h.main_concept,
-            "concepts": h.concepts,
-            "score": h.score,
-        }
-        for h in hits
-    ]
+    return [h.to_dict() for h in hits]
+
+
+def retrieve_exam_questions_batch(
+    queries: List[str], top_k: int = 5
+) -> List[List[Dict[str, Any]]]:
+    """
+    Run several free-text searches against the exam-question RAG corpus at once.
+
+    Args:
+        queries: A list of teacher queries, e.g. ["strategic risks", "capital allowances"].
+        top_k: Maximum number of hits to return per query.
+
+    Returns:
+        One list of dicts (id, text, main_concept, concepts, score) per query,
+        in the same order as `queries`.
+    """
+    batches: List[List[QuestionHit]] = search_questions_batch(queries, top_k=top_k)
+    return [[h.to_dict() for h in hits] for hits in batches]
 
 
 def retrieve_questions_by_concept(concept: str, top_k: int = 5) -> List[Dict[str, Any]]:
@@ -52,16 +79,7 @@ def retrieve_questions_by_concept(concept: str, top_k: int = 5) -> List[Dict[str
     Retrieve questions that are tagged with the given concept name.
     """
     hits: List[QuestionHit] = search_questions_by_concept(concept=concept, top_k=top_k)
-    return [
-        {
-            "id": h.id,
-            "text": h.text,
-            "main_concept": h.main_concept,
-            "concepts": h.concepts,
-            "score": h.score,
-        }
-        for h in hits
-    ]
+    return [h.to_dict() for h in hits]
 
 
 def retrieve_question_by_id(question_id: str) -> Dict[str, Any] | None:
@@ -72,31 +90,95 @@ def retrieve_question_by_id(question_id: str) -> Dict[str, Any] | None:
     if not hit:
         return None
 
-    return {
-        "id": hit.id,
-        "text": hit.text,
-        "main_concept": hit.main_concept,
-        "concepts": hit.concepts,
-        "score": hit.score,
-    }
+    return hit.to_dict()
+
+
+# ---------- Async variants (USE_ASYNC_TOOLS) ----------
+
+# Warm pool the async tools run their retrievals on, so ADK can overlap
+# several tool calls from one model turn instead of running them in turn.
+_EXEC = ThreadPoolExecutor(max_workers=4)
+
+
+def _offloaded(tool_fn):
+    """
+    Coroutine version of a sync tool, run on _EXEC. It keeps the tool's name,
+    docstring and signature, so ADK declares it exactly as the prompt names it.
+    """
+    @functools.wraps(tool_fn)
+    async def run(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _EXEC, functools.partial(tool_fn, *args, **kwargs)
+        )
+
+    return run
+
+
+retrieve_exam_questions_async = _offloaded(retrieve_exam_questions)
+retrieve_exam_questions_batch_async = _offloaded(retrieve_exam_questions_batch)
+retrieve_questions_by_concept_async = _offloaded(retrieve_questions_by_concept)
+retrieve_question_by_id_async = _offloaded(retrieve_question_by_id)
+
 
 # ---------- Wrap them as ADK tools (very old ADK API: only function) ----------
 
-retrieve_exam_questions_tool = FunctionTool(retrieve_exam_questions)
-retrieve_questions_by_concept_tool = FunctionTool(retrieve_questions_by_concept)
-retrieve_question_by_id_tool = FunctionTool(retrieve_question_by_id)
+if settings().USE_ASYNC_TOOLS:
+    retrieve_exam_questions_tool = FunctionTool(retrieve_exam_questions_async)
+    retrieve_exam_questions_batch_tool = FunctionTool(retrieve_exam_questions_batch_async)
+    retrieve_questions_by_concept_tool = FunctionTool(retrieve_questions_by_concept_async)
+    retrieve_question_by_id_tool = FunctionTool(retrieve_question_by_id_async)
+else:
+    retrieve_exam_questions_tool = FunctionTool(retrieve_exam_questions)
+    retrieve_exam_questions_batch_tool = FunctionTool(retrieve_exam_questions_batch)
+    retrieve_questions_by_concept_tool = FunctionTool(retrieve_questions_by_concept)
+    retrieve_question_by_id_tool = FunctionTool(retrieve_question_by_id)
 
 
 
 # ---------- Root agent ADK will load ----------
 
-root_agent = Agent(
-    name="question_rag",          # must match the app name in ADK dropdown
-    model="gemini-2.5-pro",
-    instruction=SYSTEM_PROMPT,
-    tools=[
-        retrieve_exam_questions_tool,
-        retrieve_questions_by_concept_tool,
-        retrieve_question_by_id_tool,
-    ],
-)
+def _build_root_agent() -> Agent:
+    if settings().USE_SERVER_SIDE_RAG:
+        # Gemini queries the RAG corpus itself during generation, so there is
+        # no separate tool-call round trip. The FunctionTools above stay
+        # available for the CLI and tests. Imported here so older ADK
+        # versions without this tool can still load the module.
+        from google.adk.tools.retrieval.vertex_ai_rag_retrieval import VertexAiRagRetrieval
+
+        agent_instruction = SERVER_SIDE_RAG_PROMPT_PATH.read_text(encoding="utf-8").strip()
+        agent_tools = [
+            VertexAiRagRetrieval(
+                name="retrieve_exam_questions_rag",
+                description="Retrieve exam questions from the question RAG corpus.",
+                rag_corpora=[_get_corpus_name()],
+                similarity_top_k=5,
+            )
+        ]
+    else:
+        agent_instruction = globals().get("SYSTEM_PROMPT") or _load_system_prompt()
+        agent_tools = [
+            retrieve_exam_questions_tool,
+            retrieve_exam_questions_batch_tool,
+            retrieve_questions_by_concept_tool,
+            retrieve_question_by_id_tool,
+        ]
+
+    agent = Agent(
+        name="question_rag",          # must match the app name in ADK dropdown
+        model="gemini-2.5-pro",
+        instruction=agent_instruction,
+        tools=agent_tools,
+    )
+    globals()["root_agent"] = agent
+    return agent
+
+
+def __getattr__(name: str) -> Any:
+    # SYSTEM_PROMPT and root_agent are created on first access, so importing
+    # the tool functions (CLI, tests) doesn't read the prompt or build the agent.
+    if name == "SYSTEM_PROMPT":
+        return _load_system_prompt()
+    if name == "root_agent":
+        return _build_root_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import sys
+
 from question_rag.agents.retrieval_tools import search_questions
 
 
@@ -17,23 +19,29 @@ def main() -> None:
     except ValueError:
         top_k = 5
 
-    print("\nSearching RAG corpus...\n")
+    print("\nSearching RAG corpus...\n", flush=True)
     hits = search_questions(query=query, top_k=top_k)
 
     if not hits:
         print("No results found.")
         return
 
+    parts = []
     for i, h in enumerate(hits, start=1):
         concepts_str = ", ".join(h.concepts) if h.concepts else "(none)"
-        print(f"---- Result {i} ----")
-        print(f"ID          : {h.id}")
-        print(f"Main concept: {h.main_concept}")
-        print(f"Concepts    : {concepts_str}")
-        print(f"Score       : {h.score}")
-        print("\nQuestion text:")
-        print(h.text)
-        print("-" * 20 + "\n")
+        parts.append(
+            f"---- Result {i} ----\n"
+            f"ID          : {h.id}\n"
+            f"Main concept: {h.main_concept}\n"
+            f"Concepts    : {concepts_str}\n"
+            f"Score       : {h.score}\n"
+            "\nQuestion text:\n"
+            f"{h.text}\n"
+            f"{'-' * 20}\n\n"
+        )
+
+    sys.stdout.write("".join(parts))
+    sys.stdout.flush()
 
 
 if __name__ == "__main__":
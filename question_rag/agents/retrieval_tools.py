@@ -2,27 +2,120 @@
 
 from __future__ import annotations
 
-import re
-from dataclasses import dataclass
-from typing import List, Dict, Any
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, FrozenSet, Tuple
 
 import vertexai
 from vertexai import rag
 
-from question_rag.config import PROJECT_ID, LOCATION, CORPUS_NAME
+from question_rag.config import settings
+from question_rag import query_cache
+from question_rag.metadata import (
+    NORMALIZED_METADATA_PATH,
+    load_normalized_metadata,
+    topics_sentence,
+)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class QuestionHit:
+    # Frozen: cached hits are shared by every caller of search_questions
     id: str
     text: str
     main_concept: str
-    concepts: List[str]
+    concepts: Tuple[str, ...]
     score: float
 
+    # Lowercased copies for concept matching, computed once per hit
+    _main_concept_lc: str = field(init=False, repr=False, compare=False)
+    _concepts_lc: FrozenSet[str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        concepts = tuple(self.concepts or ())
+        object.__setattr__(self, "concepts", concepts)
+        object.__setattr__(self, "_main_concept_lc", (self.main_concept or "").lower())
+        object.__setattr__(self, "_concepts_lc", frozenset(c.lower() for c in concepts))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict form returned by the agent tools."""
+        return {
+            "id": self.id,
+            "text": self.text,
+            "main_concept": self.main_concept,
+            "concepts": list(self.concepts),
+            "score": self.score,
+        }
+
 
 def _get_corpus_name() -> str:
-    return f"projects/{PROJECT_ID}/locations/{LOCATION}/ragCorpora/{CORPUS_NAME}"
+    s = settings()
+    return f"projects/{s.PROJECT_ID}/locations/{s.LOCATION}/ragCorpora/{s.CORPUS_NAME}"
+
+
+_CORPUS_NAME = _get_corpus_name()
+_INITIALIZED = False
+
+# Shared pool for fanning out IO-bound retrievals
+_POOL = ThreadPoolExecutor(max_workers=8)
+
+
+def _ensure_init() -> None:
+    """Initialise the Vertex AI SDK once per process."""
+    global _INITIALIZED
+    if not _INITIALIZED:
+        s = settings()
+        vertexai.init(project=s.PROJECT_ID, location=s.LOCATION)
+        _INITIALIZED = True
+
+
+def _split_concepts(concepts_raw: str) -> List[str]:
+    return [c for c in (part.strip() for part in concepts_raw.split(";")) if c]
+
+
+def _header_value(line: str, prefix: str) -> str | None:
+    """Value of a '[LABEL: value]' header line, or None if the line isn't one."""
+    if line.startswith(prefix) and line.endswith("]"):
+        return line[len(prefix):-1].strip()
+    return None
+
+
+def _find_terminator(body: str) -> int:
+    """Index where the first line that is exactly '---' starts (len(body) if none)."""
+    if body.startswith("---") and (len(body) == 3 or body[3] == "\n"):
+        return 0
+    i = body.find("\n---")
+    while i != -1:
+        end = i + 4
+        if end == len(body) or body[end] == "\n":
+            return i
+        i = body.find("\n---", end)
+    return len(body)
+
+
+def _question_text(text: str, main_concept: str, concepts: List[str]) -> str:
+    """Strip the block text and drop the trailing generated Topics sentence, if present."""
+    text = text.strip()
+    sentence = topics_sentence(main_concept, concepts)
+    if sentence and text.endswith(sentence):
+        head = text[: -len(sentence)]
+        # Only when it is its own paragraph, as written by ingestion
+        if not head or head.endswith("\n\n"):
+            return head.rstrip()
+    return text
+
+
+# Line boundaries str.splitlines() knows besides "\n"; chunks containing any
+# of them take the line-based fallback so both paths split lines the same way
+_OTHER_LINE_BREAKS = ("\r", "\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029")
+
+
+def _only_newline_breaks(raw: str) -> bool:
+    for sep in _OTHER_LINE_BREAKS:
+        if sep in raw:
+            return False
+    return True
 
 
 def _parse_block(raw: str) -> Dict[str, Any]:
@@ -39,8 +132,28 @@ def _parse_block(raw: str) -> Dict[str, Any]:
 
         ---
     """
+    # Fast path: three header lines and a blank line, found with one split
+    parts = raw.split("\n", 4)
+    if len(parts) == 5 and not parts[3] and _only_newline_breaks(raw):
+        id_ = _header_value(parts[0], "[ID:")
+        main_concept = _header_value(parts[1], "[MAIN_CONCEPT:")
+        concepts_raw = _header_value(parts[2], "[CONCEPTS:")
+        if id_ is not None and main_concept is not None and concepts_raw is not None:
+            body = parts[4]
+            concepts = _split_concepts(concepts_raw)
+            question_text = _question_text(
+                body[:_find_terminator(body)], main_concept, concepts
+            )
+            return {
+                "id": id_,
+                "main_concept": main_concept,
+                "concepts": concepts,
+                "text": question_text or raw.strip(),
+            }
+
+    # Fallback for chunks that don't follow the exact layout
     lines = raw.splitlines()
-    if len(lines) < 1:
+    if not lines:
         return {
             "id": "UNKNOWN_ID",
             "main_concept": "UNKNOWN",
@@ -54,12 +167,12 @@ def _parse_block(raw: str) -> Dict[str, Any]:
             return bracket_line[len(prefix):].rstrip("]").strip()
         return default
 
-    id_ = extract(lines[0], "ID", "UNKNOWN_ID") if len(lines) > 0 else "UNKNOWN_ID"
+    id_ = extract(lines[0], "ID", "UNKNOWN_ID")
     main_concept = (
         extract(lines[1], "MAIN_CONCEPT", "UNKNOWN") if len(lines) > 1 else "UNKNOWN"
     )
     concepts_raw = extract(lines[2], "CONCEPTS", "") if len(lines) > 2 else ""
-    concepts = [c.strip() for c in concepts_raw.split(";") if c.strip()]
+    concepts = _split_concepts(concepts_raw)
 
     # Find the '---' line that ends this block
     try:
@@ -68,7 +181,9 @@ def _parse_block(raw: str) -> Dict[str, Any]:
         sep_index = len(lines)
 
     question_lines = lines[4:sep_index]  # skip 0,1,2 header + 3 blank
-    question_text = "\n".join(question_lines).strip() or raw.strip()
+    question_text = (
+        _question_text("\n".join(question_lines), main_concept, concepts) or raw.strip()
+    )
 
     return {
         "id": id_,
@@ -78,23 +193,28 @@ def _parse_block(raw: str) -> Dict[str, Any]:
     }
 
 
-def search_questions(query: str, top_k: int = 5) -> List[QuestionHit]:
+@functools.lru_cache(maxsize=settings().RAG_CACHE_SIZE)
+def _retrieve_raw(query: str, top_k: int) -> Tuple[QuestionHit, ...]:
     """
-    Query the RAG corpus by free-text `query`.
+    Run one RAG retrieval and parse the returned contexts.
 
-    Returns a list of QuestionHit objects containing:
-      - id
-      - text (question text)
-      - main_concept
-      - concepts (list)
-      - score (retrieval score)
+    Results are cached per (query, top_k), so repeated queries within a
+    session skip the network round trip. A tuple is returned so the cached
+    value cannot be modified by callers. Misses fall through to the on-disk
+    query cache before going to Vertex, so results also survive restarts.
     """
-    vertexai.init(project=PROJECT_ID, location=LOCATION)
-    corpus_name = _get_corpus_name()
+    cached = query_cache.lookup(_CORPUS_NAME, query, top_k)
+    if cached is not None:
+        try:
+            return tuple(QuestionHit(**h) for h in cached)
+        except TypeError:
+            pass  # entry written with a different schema; fetch it again
+
+    _ensure_init()
 
     retrieval_config = rag.RagRetrievalConfig(top_k=top_k)
     response = rag.retrieval_query(
-        rag_resources=[rag.RagResource(rag_corpus=corpus_name)],
+        rag_resources=[rag.RagResource(rag_corpus=_CORPUS_NAME)],
         text=query,
         rag_retrieval_config=retrieval_config,
     )
@@ -109,7 +229,7 @@ def search_questions(query: str, top_k: int = 5) -> List[QuestionHit]:
 
         parsed = _parse_block(raw_text)
         hits.append(
-            QuestionHit(    
+            QuestionHit(
                 id=parsed["id"],
                 text=parsed["text"],
                 main_concept=parsed["main_concept"],
@@ -118,7 +238,37 @@ def search_questions(query: str, top_k: int = 5) -> List[QuestionHit]:
             )
         )
 
-    return hits
+    query_cache.store(_CORPUS_NAME, query, top_k, [h.to_dict() for h in hits])
+    return tuple(hits)
+
+
+def search_questions(query: str, top_k: int = 5) -> List[QuestionHit]:
+    """
+    Query the RAG corpus by free-text `query`.
+
+    Returns a list of QuestionHit objects containing:
+      - id
+      - text (question text)
+      - main_concept
+      - concepts (list)
+      - score (retrieval score)
+    """
+    return list(_retrieve_raw(query, top_k))
+
+
+def search_questions_batch(queries: List[str], top_k: int = 5) -> List[List[QuestionHit]]:
+    """
+    Run several free-text searches concurrently.
+
+    Returns one list of QuestionHit objects per query, in the same order
+    as `queries`. Repeated queries are only sent once.
+    """
+    futures = {_POOL.submit(_retrieve_raw, q, top_k): q for q in dict.fromkeys(queries)}
+    by_query: Dict[str, Tuple[QuestionHit, ...]] = {}
+    for future in as_completed(futures):
+        by_query[futures[future]] = future.result()
+
+    return [list(by_query[q]) for q in queries]
 
 
 from typing import List, Optional
@@ -126,27 +276,94 @@ from typing import List, Optional
 # ... existing imports and code (including QuestionHit and search_questions) ...
 
 
+# ---------- Local indexes (from normalized_metadata.json) ----------
+
+def _metadata_version() -> int:
+    """mtime of normalized_metadata.json (0 if missing); indexes rebuild when it changes."""
+    try:
+        return NORMALIZED_METADATA_PATH.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _id_index() -> Dict[str, QuestionHit]:
+    """
+    Local ID -> QuestionHit index built from normalized_metadata.json.
+
+    Empty if ingestion hasn't been run on this machine or the file can't be
+    read. Rebuilt whenever the file changes, so a re-ingestion is picked up
+    without a restart.
+    """
+    return _build_id_index(_metadata_version())
+
+
+def _concept_index() -> Dict[str, List[QuestionHit]]:
+    """Local lowercased concept -> [QuestionHit, ...] index (see _build_concept_index)."""
+    return _build_concept_index(_metadata_version())
+
+
+@functools.lru_cache(maxsize=1)
+def _build_id_index(version: int) -> Dict[str, QuestionHit]:
+    try:
+        entries = load_normalized_metadata()
+    except (OSError, ValueError):
+        # Unreadable or corrupt file: no local index, lookups go to RAG
+        return {}
+
+    return {
+        e["id"].strip().lower(): QuestionHit(
+            id=e["id"],
+            text=e["text"],
+            main_concept=e["main_concept"].strip(),
+            concepts=e["concepts"],
+            score=1.0,
+        )
+        for e in entries
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def _build_concept_index(version: int) -> Dict[str, List[QuestionHit]]:
+    """
+    Each question is listed under its main concept and each of its concepts.
+    Questions whose main concept is the key come first, then the ones that
+    only list it as a related concept; each group stays in ID order.
+    """
+    index: Dict[str, List[QuestionHit]] = {}
+    related: Dict[str, List[QuestionHit]] = {}
+    for h in _build_id_index(version).values():
+        index.setdefault(h._main_concept_lc, []).append(h)
+        for key in h._concepts_lc - {h._main_concept_lc}:
+            related.setdefault(key, []).append(h)
+    for key, hits in related.items():
+        index.setdefault(key, []).extend(hits)
+    return index
+
+
 def search_questions_by_concept(concept: str, top_k: int = 5) -> List[QuestionHit]:
     """
     Search questions that are tagged with a given concept.
 
     Strategy:
-    - First, use the concept text as a normal RAG query.
-    - Then, filter results where the concept appears in main_concept or concepts list.
+    - If the local concept index knows this concept, return its questions
+      without calling RAG (the index holds every tagged question).
+    - Otherwise, use the concept text as a normal RAG query.
+    - Then, keep results where the concept appears in main_concept or concepts
+      list, in the server's score order.
     """
-    # Ask RAG for a bit more than we need, then filter down
-    raw_hits: List[QuestionHit] = search_questions(query=concept, top_k=top_k * 3)
-
     target = concept.strip().lower()
-    filtered: List[QuestionHit] = []
-    for h in raw_hits:
-        concepts_lower = [c.lower() for c in (h.concepts or [])]
-        main_lower = (h.main_concept or "").lower()
-        if target == main_lower or target in concepts_lower:
-            filtered.append(h)
+    local = _concept_index().get(target)
+    if local:
+        return local[:top_k]
+
+    raw_hits: List[QuestionHit] = search_questions(query=concept, top_k=top_k)
+    return [
+        h for h in raw_hits if target == h._main_concept_lc or target in h._concepts_lc
+    ]
 
-    # Fallback: if filtering removed everything, just return the raw hits
-    return (filtered or raw_hits)[:top_k]
+
+# Resolved ID lookups, keyed by normalized ID (IDs are stable per corpus)
+_ID_CACHE: Dict[str, QuestionHit] = {}
 
 
 def get_question_by_id(question_id: str) -> Optional[QuestionHit]:
@@ -154,15 +371,25 @@ def get_question_by_id(question_id: str) -> Optional[QuestionHit]:
     Try to retrieve a single question by its ID (e.g. 'q_001').
 
     Strategy:
-    - Query RAG using the ID string.
-    - Look for an exact ID match in the parsed hits.
+    - Look the ID up in the local index from normalized_metadata.json.
+    - If it isn't there (no local metadata, or a corpus newer than the local
+      file), query RAG using the ID string and look for an exact ID match in
+      the parsed hits.
     """
     qid = question_id.strip().lower()
+    local = _id_index().get(qid)
+    if local is not None:
+        return local
+
+    cached = _ID_CACHE.get(qid)
+    if cached is not None:
+        return cached
 
     # Ask RAG for a small batch
     hits: List[QuestionHit] = search_questions(query=question_id, top_k=10)
     for h in hits:
         if (h.id or "").strip().lower() == qid:
+            _ID_CACHE[qid] = h
             return h
 
     return None
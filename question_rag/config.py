@@ -1,6 +1,10 @@
 # question_rag/config.py
 
 import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
 from dotenv import load_dotenv
 
 # Find the project root (one folder above this file)
@@ -10,25 +14,81 @@ ENV_PATH = os.path.join(ROOT_DIR, ".env")
 # Load the .env file from the project root
 load_dotenv(ENV_PATH, override=True)
 
-# GCP / Vertex AI
-PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT")
-LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION")
-USE_VERTEX = os.getenv("GOOGLE_GENAI_USE_VERTEXAI", "True") == "True"
 
-# RAG settings
-BUCKET_NAME = os.getenv("RAG_BUCKET_NAME")
-CORPUS_NAME = os.getenv("RAG_CORPUS_NAME")
-CORPUS_FILE = os.getenv("RAG_CORPUS_FILE", "metadata_tagging_file.txt")
+def _user_cache_dir() -> str:
+    base = (
+        os.getenv("XDG_CACHE_HOME")
+        or os.getenv("LOCALAPPDATA")
+        or os.path.join(os.path.expanduser("~"), ".cache")
+    )
+    return os.path.join(base, "question_rag")
+
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in ("true", "1", "yes")
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    # GCP / Vertex AI
+    PROJECT_ID: Optional[str]
+    LOCATION: Optional[str]
+    USE_VERTEX: bool
+
+    # RAG settings
+    BUCKET_NAME: Optional[str]
+    CORPUS_NAME: Optional[str]
+    CORPUS_FILE: str
+
+    # Retrieval caching (number of (query, top_k) results kept in memory)
+    RAG_CACHE_SIZE: int
+
+    # Persistent on-disk cache of retrieval results (TTL <= 0 disables it)
+    RAG_CACHE_TTL_SEC: int
+    RAG_QUERY_CACHE_PATH: str
+
+    # Let Gemini retrieve from the corpus itself instead of calling our Python tools
+    USE_SERVER_SIDE_RAG: bool
+
+    # Register the coroutine tools so ADK can run several tool calls at once
+    USE_ASYNC_TOOLS: bool
+
+    # (Optional for later)
+    CONCEPT_THRESHOLD: float
+    DEFAULT_MAIN_CONCEPT: str
+
+    EMBEDDING_MODEL: str
+    GENERATION_MODEL: str
+
 
-# (Optional for later)
-CONCEPT_THRESHOLD = float(os.getenv("CONCEPT_SCORE_THRESHOLD", 0.1))
-DEFAULT_MAIN_CONCEPT = os.getenv("DEFAULT_MAIN_CONCEPT", "UNKNOWN")
+@lru_cache(maxsize=1)
+def settings() -> Settings:
+    """Parse the environment once and return the shared Settings."""
+    return Settings(
+        PROJECT_ID=os.getenv("GOOGLE_CLOUD_PROJECT"),
+        LOCATION=os.getenv("GOOGLE_CLOUD_LOCATION"),
+        USE_VERTEX=_env_bool("GOOGLE_GENAI_USE_VERTEXAI", "True"),
+        BUCKET_NAME=os.getenv("RAG_BUCKET_NAME"),
+        CORPUS_NAME=os.getenv("RAG_CORPUS_NAME"),
+        CORPUS_FILE=os.getenv("RAG_CORPUS_FILE", "metadata_tagging_file.txt"),
+        RAG_CACHE_SIZE=int(os.getenv("RAG_CACHE_SIZE", 1024)),
+        RAG_CACHE_TTL_SEC=int(os.getenv("RAG_CACHE_TTL_SEC", 24 * 60 * 60)),
+        RAG_QUERY_CACHE_PATH=os.getenv(
+            "RAG_QUERY_CACHE_PATH",
+            os.path.join(_user_cache_dir(), "query_cache.sqlite3"),
+        ),
+        USE_SERVER_SIDE_RAG=_env_bool("USE_SERVER_SIDE_RAG", "False"),
+        USE_ASYNC_TOOLS=_env_bool("USE_ASYNC_TOOLS", "False"),
+        CONCEPT_THRESHOLD=float(os.getenv("CONCEPT_SCORE_THRESHOLD", 0.1)),
+        DEFAULT_MAIN_CONCEPT=os.getenv("DEFAULT_MAIN_CONCEPT", "UNKNOWN"),
+        EMBEDDING_MODEL=os.getenv("EMBEDDING_MODEL", "text-embedding-004"),
+        GENERATION_MODEL=os.getenv("GENERATION_MODEL", "gemini-1.5-flash"),
+    )
 
-EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-004")
-GENERATION_MODEL = os.getenv("GENERATION_MODEL", "gemini-1.5-flash")
 
 if __name__ == "__main__":
-    print("PROJECT_ID:", PROJECT_ID)
-    print("LOCATION:", LOCATION)
-    print("BUCKET_NAME:", BUCKET_NAME)
-    print("CORPUS_NAME:", CORPUS_NAME)
+    s = settings()
+    print("PROJECT_ID:", s.PROJECT_ID)
+    print("LOCATION:", s.LOCATION)
+    print("BUCKET_NAME:", s.BUCKET_NAME)
+    print("CORPUS_NAME:", s.CORPUS_NAME)
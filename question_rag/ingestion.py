@@ -3,24 +3,45 @@
 from __future__ import annotations
 
 import json
-from pathlib import Path
-from typing import List, Dict
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable, List, Dict
 
 from google.cloud import storage
+from google.cloud.storage import transfer_manager
 import vertexai
 from vertexai import rag
 
-from .config import PROJECT_ID, LOCATION, BUCKET_NAME, CORPUS_NAME, CORPUS_FILE
+try:
+    import orjson
+except ImportError:  # optional speed-up; fall back to stdlib json
+    orjson = None
+
+from . import query_cache
+from .config import settings
+from .metadata import (
+    BASE_DIR,
+    INPUT_DIR,
+    NORMALIZED_METADATA_PATH,
+    clean_concept,
+    topics_sentence,
+)
 
 # ---------- Paths ----------
 
-BASE_DIR = Path(__file__).parent
-INPUT_DIR = BASE_DIR / "input"
 OUTPUT_DIR = BASE_DIR / "output"
 
 INPUT_METADATA_PATH = INPUT_DIR / "metadata_input.json"
-NORMALIZED_METADATA_PATH = INPUT_DIR / "normalized_metadata.json"
-LOCAL_CORPUS_PATH = BASE_DIR / CORPUS_FILE  # usually "metadata_tagging_file.txt"
+LOCAL_CORPUS_PATH = BASE_DIR / settings().CORPUS_FILE  # usually "metadata_tagging_file.txt"
+
+# ---------- Upload tuning ----------
+
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # files larger than this are uploaded in parallel chunks
+UPLOAD_MAX_WORKERS = 8
+
+# Runs the RAG import in the background (see start_rag_import)
+_IMPORT_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-import")
 
 
 # ---------- Step 1: Load teacher/matcher JSON ----------
@@ -33,8 +54,11 @@ def load_raw_metadata() -> Dict:
             "This file should contain the 'questions' + 'matches' structure."
         )
 
-    with INPUT_METADATA_PATH.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    if orjson is not None:
+        data = orjson.loads(INPUT_METADATA_PATH.read_bytes())
+    else:
+        with INPUT_METADATA_PATH.open("r", encoding="utf-8") as f:
+            data = json.load(f)
 
     if "questions" not in data or not isinstance(data["questions"], list):
         raise ValueError(
@@ -77,29 +101,34 @@ def normalize_metadata(raw: Dict) -> List[Dict]:
       ]
     """
     normalized: List[Dict] = []
+    append = normalized.append
+
+    # Local aliases keep attribute lookups out of the per-question loop
+    get = dict.get
+    strip = str.strip
+    clean = clean_concept
+    fmt = "q_{:03d}".format
 
-    questions = raw.get("questions", [])
+    questions = get(raw, "questions", [])
     for idx, item in enumerate(questions, start=1):
-        q_text = item.get("question", "").strip()
-        matches = item.get("matches", []) or []
+        q_text = strip(get(item, "question", ""))
+        matches = get(item, "matches", []) or []
 
         # ID: q_001, q_002, ...
-        q_id = f"q_{idx:03d}"
+        q_id = fmt(idx)
 
         # Main concept = best match (if any)
         if matches:
-            main_concept = matches[0].get("concept", "UNKNOWN")
+            main_concept = clean(get(matches[0], "concept") or "") or "UNKNOWN"
             # Keep up to top 3 concepts
             concept_list = [
-                m.get("concept", "").strip()
-                for m in matches[:3]
-                if m.get("concept")
+                c for c in (clean(get(m, "concept") or "") for m in islice(matches, 3)) if c
             ]
         else:
             main_concept = "UNKNOWN"
             concept_list = []
 
-        normalized.append(
+        append(
             {
                 "id": q_id,
                 "text": q_text,
@@ -112,19 +141,31 @@ def normalize_metadata(raw: Dict) -> List[Dict]:
 
 
 def save_normalized_metadata(entries: List[Dict]) -> None:
-    """Write normalized metadata to input/normalized_metadata.json."""
+    """
+    Write normalized metadata to input/normalized_metadata.json.
+
+    The file is written next to the target and then renamed over it, so a
+    running agent never reads a half-written file.
+    """
     INPUT_DIR.mkdir(parents=True, exist_ok=True)
-    with NORMALIZED_METADATA_PATH.open("w", encoding="utf-8") as f:
-        json.dump(entries, f, ensure_ascii=False, indent=2)
+    tmp_path = NORMALIZED_METADATA_PATH.with_suffix(".json.tmp")
+    if orjson is not None:
+        tmp_path.write_bytes(
+            orjson.dumps(entries, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        )
+    else:
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, NORMALIZED_METADATA_PATH)
     print(f"[INGEST] Wrote normalized metadata to: {NORMALIZED_METADATA_PATH}")
     print(f"[INGEST] Total questions: {len(entries)}")
 
 
 # ---------- Step 3: Build corpus text file ----------
 
-def build_corpus_text(entries: List[Dict]) -> str:
+def write_corpus_file(entries: Iterable[Dict]) -> None:
     """
-    Build the text that will go into metadata_tagging_file.txt, e.g.:
+    Stream the corpus blocks into the local CORPUS_FILE (e.g. metadata_tagging_file.txt):
 
     [ID: q_001]
     [MAIN_CONCEPT: ...]
@@ -132,37 +173,33 @@ def build_corpus_text(entries: List[Dict]) -> str:
 
     Question text...
 
-    ---
-    """
-    blocks: List[str] = []
-
-    for e in entries:
-        q_id = e.get("id", "").strip()
-        text = e.get("text", "").strip()
-        main_concept = e.get("main_concept", "UNKNOWN").strip()
-        concepts = e.get("concepts") or []
-
-        concepts_str = "; ".join(c for c in concepts if c)
-
-        header_lines = [
-            f"[ID: {q_id}]",
-            f"[MAIN_CONCEPT: {main_concept}]",
-            f"[CONCEPTS: {concepts_str}]",
-            "",
-            text,
-            "",
-            "---",
-        ]
-
-        blocks.append("\n".join(header_lines))
-
-    return "\n\n".join(blocks).strip() + "\n"
+    Topics: <main concept>. Related concepts: A, B, C.
 
+    ---
 
-def save_corpus_file(corpus_text: str) -> None:
-    """Save corpus text to the local CORPUS_FILE (e.g. metadata_tagging_file.txt)."""
-    with LOCAL_CORPUS_PATH.open("w", encoding="utf-8") as f:
-        f.write(corpus_text)
+    The trailing "Topics:" sentence repeats the tags in plain prose so they
+    are part of the embedded text (the bracket headers are mostly ignored
+    by the embedder). It is stripped again when blocks are parsed, and left
+    out for untagged questions.
+    """
+    with LOCAL_CORPUS_PATH.open("w", buffering=1 << 20, encoding="utf-8") as f:
+        for e in entries:
+            q_id = e.get("id", "").strip()
+            text = e.get("text", "").strip()
+            main_concept = e.get("main_concept", "UNKNOWN").strip()
+            concepts = e.get("concepts") or []
+
+            concepts = [c for c in map(clean_concept, concepts) if c]
+            concepts_str = "; ".join(concepts)
+
+            topics = topics_sentence(main_concept, concepts)
+            if topics:
+                text = f"{text}\n\n{topics}"
+
+            f.write(
+                f"[ID: {q_id}]\n[MAIN_CONCEPT: {main_concept}]\n[CONCEPTS: {concepts_str}]\n\n"
+                f"{text}\n\n---\n\n"
+            )
     print(f"[INGEST] Wrote corpus file to: {LOCAL_CORPUS_PATH}")
 
 
@@ -173,12 +210,21 @@ def upload_corpus_to_gcs() -> str:
     Upload the local corpus file to the configured bucket.
     Returns the GCS URI (gs://...).
     """
-    client = storage.Client(project=PROJECT_ID)
-    bucket = client.bucket(BUCKET_NAME)
-    blob = bucket.blob(CORPUS_FILE)
-
-    blob.upload_from_filename(str(LOCAL_CORPUS_PATH))
-    gcs_uri = f"gs://{BUCKET_NAME}/{CORPUS_FILE}"
+    s = settings()
+    client = storage.Client(project=s.PROJECT_ID)
+    bucket = client.bucket(s.BUCKET_NAME)
+    blob = bucket.blob(s.CORPUS_FILE)
+
+    if LOCAL_CORPUS_PATH.stat().st_size > UPLOAD_CHUNK_SIZE:
+        transfer_manager.upload_chunks_concurrently(
+            str(LOCAL_CORPUS_PATH),
+            blob,
+            chunk_size=UPLOAD_CHUNK_SIZE,
+            max_workers=UPLOAD_MAX_WORKERS,
+        )
+    else:
+        blob.upload_from_filename(str(LOCAL_CORPUS_PATH))
+    gcs_uri = f"gs://{s.BUCKET_NAME}/{s.CORPUS_FILE}"
     print(f"[INGEST] Uploaded corpus file to: {gcs_uri}")
     return gcs_uri
 
@@ -187,27 +233,51 @@ def upload_corpus_to_gcs() -> str:
 
 def import_into_rag(gcs_uri: str) -> None:
     """Call Vertex RAG to (re)import the corpus file from GCS using your SDK's signature."""
-    vertexai.init(project=PROJECT_ID, location=LOCATION)
+    s = settings()
+    vertexai.init(project=s.PROJECT_ID, location=s.LOCATION)
 
     rag_corpus_name = (
-        f"projects/{PROJECT_ID}/locations/{LOCATION}/ragCorpora/{CORPUS_NAME}"
+        f"projects/{s.PROJECT_ID}/locations/{s.LOCATION}/ragCorpora/{s.CORPUS_NAME}"
     )
     print(f"[INGEST] Re-importing into RAG corpus: {rag_corpus_name}")
 
     # Most minimal signature: (rag_corpus_name, [uris])
-    rag.import_files(
+    response = rag.import_files(
         rag_corpus_name,
         [gcs_uri],
     )
 
     print("[INGEST] RAG import request sent using minimal signature rag.import_files(name, [uri]).")
+    print(
+        "[INGEST] RAG import finished, imported files:",
+        getattr(response, "imported_rag_files_count", "unknown"),
+    )
+
+    # Cached retrieval results refer to the old corpus contents
+    query_cache.clear()
+
+
+def start_rag_import(gcs_uri: str) -> Future:
+    """
+    Run import_into_rag in the background and return its Future.
 
+    Call .result() to wait for the import; it re-raises any import error.
+    """
+    future = _IMPORT_POOL.submit(import_into_rag, gcs_uri)
+    print("[INGEST] RAG import running in the background.")
+    return future
 
 
 # ---------- Orchestrator ----------
 
-def run_ingestion() -> None:
-    """End-to-end ingestion: input JSON -> normalized -> corpus -> GCS -> RAG."""
+def run_ingestion() -> Future:
+    """
+    End-to-end ingestion: input JSON -> normalized -> corpus -> GCS -> RAG.
+
+    Returns as soon as the RAG import has been started. The returned Future
+    completes when Vertex has imported the corpus file, and .result()
+    re-raises if the import failed.
+    """
     print("=== Question RAG Ingestion ===")
 
     # 1) Load raw teacher/matcher JSON
@@ -219,21 +289,23 @@ def run_ingestion() -> None:
     entries = normalize_metadata(raw)
     save_normalized_metadata(entries)
 
-    # 3) Build corpus text and save
+    # 3) Write corpus text file
     print("[STEP 3] Building corpus text file...")
-    corpus_text = build_corpus_text(entries)
-    save_corpus_file(corpus_text)
+    write_corpus_file(entries)
 
     # 4) Upload to GCS
     print("[STEP 4] Uploading corpus file to Cloud Storage...")
     gcs_uri = upload_corpus_to_gcs()
 
-    # 5) Import into existing RAG corpus
+    # 5) Import into existing RAG corpus (in the background)
     print("[STEP 5] Importing file into RAG corpus...")
-    import_into_rag(gcs_uri)
+    import_future = start_rag_import(gcs_uri)
 
-    print("=== Ingestion complete ===")
+    print("=== Local ingestion steps complete (RAG import still running) ===")
+    return import_future
 
 
 if __name__ == "__main__":
-    run_ingestion()
+    # Wait for the import so a failure surfaces here and the exit code is non-zero
+    run_ingestion().result()
+    print("=== Ingestion complete ===")
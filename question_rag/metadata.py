@@ -0,0 +1,55 @@
+# question_rag/metadata.py
+#
+# Normalized-metadata location and reader shared by ingestion and the
+# query-time tools. Kept free of cloud SDK imports so retrieval doesn't
+# pull in the ingestion stack.
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Iterable, List, Dict
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; fall back to stdlib json
+    orjson = None
+
+BASE_DIR = Path(__file__).parent
+INPUT_DIR = BASE_DIR / "input"
+NORMALIZED_METADATA_PATH = INPUT_DIR / "normalized_metadata.json"
+
+
+def clean_concept(name: str) -> str:
+    """
+    Concept name as stored in the metadata and corpus. ';' separates names in
+    the [CONCEPTS: ...] header, so it is replaced to keep the header parseable.
+    """
+    return name.strip().replace(";", ",")
+
+
+def topics_sentence(main_concept: str, concepts: Iterable[str]) -> str:
+    """
+    The "Topics: ..." sentence appended to each corpus block so the tags are
+    embedded with the question. The parser strips exactly this sentence.
+    Untagged questions (main concept "UNKNOWN") get none ("").
+    """
+    if main_concept == "UNKNOWN":
+        return ""
+
+    sentence = f"Topics: {main_concept}."
+    concepts_str = ", ".join(concepts)
+    if concepts_str:
+        sentence += f" Related concepts: {concepts_str}."
+    return sentence
+
+
+def load_normalized_metadata() -> List[Dict]:
+    """Read input/normalized_metadata.json back (empty list if it doesn't exist yet)."""
+    if not NORMALIZED_METADATA_PATH.exists():
+        return []
+
+    if orjson is not None:
+        return orjson.loads(NORMALIZED_METADATA_PATH.read_bytes())
+    with NORMALIZED_METADATA_PATH.open("r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,122 @@
+# question_rag/query_cache.py
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; fall back to stdlib json
+    orjson = None
+
+from .config import settings
+
+# One shared connection; retrievals may run on several threads at once
+_LOCK = threading.Lock()
+_CONN: Optional[sqlite3.Connection] = None
+
+# The cache is only an optimisation; any of these means "treat as a miss"
+_CACHE_ERRORS = (sqlite3.Error, OSError, ValueError, TypeError)
+
+
+def _connect() -> sqlite3.Connection:
+    """Open the cache database on first use and drop expired rows."""
+    global _CONN
+    if _CONN is None:
+        path = Path(settings().RAG_QUERY_CACHE_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        conn = sqlite3.connect(str(path), check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_cache ("
+            "qhash BLOB PRIMARY KEY, topk INTEGER NOT NULL, "
+            "payload BLOB NOT NULL, ts INTEGER NOT NULL)"
+        )
+        conn.execute(
+            "DELETE FROM query_cache WHERE ts < ?",
+            (int(time.time()) - settings().RAG_CACHE_TTL_SEC,),
+        )
+        conn.commit()
+        _CONN = conn
+    return _CONN
+
+
+def _key(corpus_name: str, query: str, top_k: int) -> bytes:
+    return hashlib.blake2b(
+        f"{corpus_name}|{query}|{top_k}".encode("utf-8"), digest_size=16
+    ).digest()
+
+
+def _dumps(hits: List[Dict[str, Any]]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(hits)
+    return json.dumps(hits, ensure_ascii=False).encode("utf-8")
+
+
+def _loads(payload: bytes) -> List[Dict[str, Any]]:
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def lookup(corpus_name: str, query: str, top_k: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Return the cached hits (as dicts) for this query, or None on a miss.
+
+    Entries older than RAG_CACHE_TTL_SEC count as misses.
+    """
+    ttl = settings().RAG_CACHE_TTL_SEC
+    if ttl <= 0:
+        return None
+
+    try:
+        with _LOCK:
+            row = _connect().execute(
+                "SELECT payload, ts FROM query_cache WHERE qhash = ?",
+                (_key(corpus_name, query, top_k),),
+            ).fetchone()
+        if row is None:
+            return None
+
+        payload, ts = row
+        if time.time() - ts > ttl:
+            return None
+        return _loads(payload)
+    except _CACHE_ERRORS:
+        # Unusable path, corrupt database or payload: never fail a search
+        return None
+
+
+def store(corpus_name: str, query: str, top_k: int, hits: List[Dict[str, Any]]) -> None:
+    """Save the hits (as dicts) for this query."""
+    if settings().RAG_CACHE_TTL_SEC <= 0:
+        return
+
+    try:
+        with _LOCK:
+            conn = _connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO query_cache (qhash, topk, payload, ts) "
+                "VALUES (?, ?, ?, ?)",
+                (_key(corpus_name, query, top_k), top_k, _dumps(hits), int(time.time())),
+            )
+            conn.commit()
+    except _CACHE_ERRORS:
+        pass
+
+
+def clear() -> None:
+    """Drop every cached result, e.g. after the corpus has been re-imported."""
+    try:
+        with _LOCK:
+            conn = _connect()
+            conn.execute("DELETE FROM query_cache")
+            conn.commit()
+    except _CACHE_ERRORS:
+        pass
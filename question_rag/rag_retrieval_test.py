@@ -3,14 +3,15 @@
 import vertexai
 from vertexai import rag
 
-from config import PROJECT_ID, LOCATION, CORPUS_NAME
+from config import settings
 
 
 def test_retrieval(query: str):
-    vertexai.init(project=PROJECT_ID, location=LOCATION)
+    s = settings()
+    vertexai.init(project=s.PROJECT_ID, location=s.LOCATION)
 
     rag_corpus_name = (
-        f"projects/{PROJECT_ID}/locations/{LOCATION}/ragCorpora/{CORPUS_NAME}"
+        f"projects/{s.PROJECT_ID}/locations/{s.LOCATION}/ragCorpora/{s.CORPUS_NAME}"
     )
 
     print("Using RAG corpus:", rag_corpus_name)
@@ -0,0 +1,156 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("vertexai")
+
+from question_rag.agents import retrieval_tools
+from question_rag.agents.retrieval_tools import QuestionHit, search_questions_by_concept
+
+
+def _hit(id_, main_concept, concepts=()):
+    return QuestionHit(
+        id=id_,
+        text=f"Question {id_}",
+        main_concept=main_concept,
+        concepts=list(concepts),
+        score=1.0,
+    )
+
+
+def _block(id_, main_concept, concepts):
+    return (
+        f"[ID: {id_}]\n"
+        f"[MAIN_CONCEPT: {main_concept}]\n"
+        f"[CONCEPTS: {'; '.join(concepts)}]\n"
+        f"\n"
+        f"Question {id_}\n"
+        f"\n"
+        f"---\n"
+    )
+
+
+@pytest.fixture
+def rag_calls(monkeypatch):
+    """Record every rag.retrieval_query call; Vertex and the disk cache are never touched."""
+    calls = []
+
+    def fake_retrieval_query(rag_resources, text, rag_retrieval_config):
+        calls.append(SimpleNamespace(text=text, top_k=rag_retrieval_config.top_k))
+        contexts = [
+            SimpleNamespace(text=_block("q_101", "Going concern", ["Audit"]), score=0.9),
+            SimpleNamespace(text=_block("q_102", "Ethics", ["Independence"]), score=0.8),
+        ]
+        return SimpleNamespace(contexts=SimpleNamespace(contexts=contexts))
+
+    monkeypatch.setattr(retrieval_tools.rag, "retrieval_query", fake_retrieval_query)
+    monkeypatch.setattr(retrieval_tools, "_INITIALIZED", True)
+    monkeypatch.setattr(retrieval_tools.query_cache, "lookup", lambda *args: None)
+    monkeypatch.setattr(retrieval_tools.query_cache, "store", lambda *args: None)
+    retrieval_tools._retrieve_raw.cache_clear()
+    yield calls
+    retrieval_tools._retrieve_raw.cache_clear()
+
+
+@pytest.fixture
+def concept_index(monkeypatch):
+    index = {
+        "audit": [_hit("q_002", "Audit", ["Risk"]), _hit("q_001", "Risk", ["Audit"])],
+        "risk": [_hit("q_001", "Risk", ["Audit"]), _hit("q_002", "Audit", ["Risk"])],
+    }
+    monkeypatch.setattr(retrieval_tools, "_concept_index", lambda: index)
+    return index
+
+
+def test_known_concept_is_served_locally(rag_calls, concept_index):
+    hits = search_questions_by_concept("  Audit ", top_k=1)
+
+    assert [h.id for h in hits] == ["q_002"]
+    assert rag_calls == []
+
+
+def test_unknown_concept_falls_back_to_one_rag_query(rag_calls, concept_index):
+    hits = search_questions_by_concept("Going concern", top_k=3)
+
+    assert len(rag_calls) == 1
+    assert rag_calls[0].text == "Going concern"
+    assert rag_calls[0].top_k == 3
+    assert [h.id for h in hits] == ["q_101"]
+
+
+def test_corrupt_metadata_falls_back_to_rag(rag_calls, monkeypatch):
+    def corrupt():
+        raise ValueError("truncated normalized_metadata.json")
+
+    monkeypatch.setattr(retrieval_tools, "load_normalized_metadata", corrupt)
+    retrieval_tools._build_id_index.cache_clear()
+    retrieval_tools._build_concept_index.cache_clear()
+    try:
+        hit = retrieval_tools.get_question_by_id("q_102")
+        by_concept = search_questions_by_concept("Going concern", top_k=2)
+    finally:
+        retrieval_tools._build_id_index.cache_clear()
+        retrieval_tools._build_concept_index.cache_clear()
+
+    assert hit is not None and hit.id == "q_102"
+    assert [h.id for h in by_concept] == ["q_101"]
+    assert len(rag_calls) == 2
+
+
+def test_cached_hits_cannot_be_modified(rag_calls):
+    first = retrieval_tools.search_questions("audit", top_k=2)
+
+    with pytest.raises(AttributeError):
+        first[0].concepts.append("X")
+    with pytest.raises(AttributeError):
+        first[0].score = 0.0
+
+    again = retrieval_tools.search_questions("audit", top_k=2)
+    assert again[0].concepts == ("Audit",)
+    assert len(rag_calls) == 1
+
+
+def test_parse_block_strips_only_the_generated_topics_sentence():
+    tagged = (
+        "[ID: q_003]\n[MAIN_CONCEPT: Audit]\n[CONCEPTS: Audit; A, B]\n\n"
+        "Topics: real paragraph.\n\nTopics: Audit. Related concepts: Audit, A, B.\n\n---\n"
+    )
+    untagged = "[ID: q_004]\n[MAIN_CONCEPT: UNKNOWN]\n[CONCEPTS: ]\n\nWhat is risk?\n\n---\n"
+
+    assert retrieval_tools._parse_block(tagged)["text"] == "Topics: real paragraph."
+    parsed = retrieval_tools._parse_block(untagged)
+    assert parsed["text"] == "What is risk?"
+    assert parsed["concepts"] == []
+
+
+def test_batch_sends_each_distinct_query_once(rag_calls):
+    results = retrieval_tools.search_questions_batch(["a", "b", "a"], top_k=2)
+
+    assert sorted(c.text for c in rag_calls) == ["a", "b"]
+    assert len(results) == 3
+    assert results[0] == results[2]
+    assert results[0] is not results[2]
+
+
+def test_concept_index_lists_main_concept_matches_first(rag_calls, monkeypatch):
+    metadata = [
+        {"id": "q_001", "text": "One", "main_concept": "Risk", "concepts": ["Risk", "Audit"]},
+        {"id": "q_002", "text": "Two", "main_concept": "Audit", "concepts": ["Audit", "Risk"]},
+        {"id": "q_003", "text": "Three", "main_concept": "Ethics", "concepts": ["Audit"]},
+        {"id": "q_004", "text": "Four", "main_concept": " Audit ", "concepts": []},
+    ]
+    monkeypatch.setattr(retrieval_tools, "load_normalized_metadata", lambda: metadata)
+    retrieval_tools._build_id_index.cache_clear()
+    retrieval_tools._build_concept_index.cache_clear()
+    try:
+        index = retrieval_tools._concept_index()
+        top_two = search_questions_by_concept("AUDIT", top_k=2)
+    finally:
+        retrieval_tools._build_id_index.cache_clear()
+        retrieval_tools._build_concept_index.cache_clear()
+
+    assert [h.id for h in index["audit"]] == ["q_002", "q_004", "q_001", "q_003"]
+    assert [h.id for h in index["risk"]] == ["q_001", "q_002"]
+    assert [h.id for h in top_two] == ["q_002", "q_004"]
+    assert rag_calls == []